@@ -15,16 +15,241 @@ import time
 import re
 import csv
 import os
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import glob
+import json
+import socket
+import sqlite3
+import hashlib
+import threading
+import multiprocessing
+import multiprocessing.util
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None  # Windows locks profile slots with msvcrt.locking instead of flock
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # only needed by validate / metrics
 
 # Target league configuration
 LEAGUE_NAME = "Croatia Prva NL"
 LEAGUE_SLUG = "croatia/prva-nl"
 OUTPUT_PREFIX = LEAGUE_SLUG.replace('/', '-')
 
+OU_LINES = [2, 2.25, 2.5, 2.75, 3]
+AH_LINES = [0, -0.25, -0.5, -0.75, -1, -1.25, 0.25, 0.5, 0.75, 1, 1.25]
+
+
+def ou_line_key(line):
+    """2.5 -> '2_5' (column infix for O/U lines)."""
+    return str(line).replace('.', '_')
+
+
+def ah_line_key(line):
+    """-0.25 -> 'minus_0_25', 1 -> 'plus_1', 0 -> '0' (column infix for AH lines)."""
+    if line > 0:
+        return f"plus_{str(line).replace('.', '_')}"
+    elif line < 0:
+        return f"minus_{str(abs(line)).replace('.', '_')}"
+    return "0"
+
+
+# Output columns, in order
+FIELDNAMES = [
+    'League', 'Season', 'URL', 'Home', 'Away', 'Date', 'Final_Result', 'HT_Result',
+    '1X2_Close_1', '1X2_Close_X', '1X2_Close_2', '1X2_Open_1', '1X2_Open_X', '1X2_Open_2',
+    'OU_2_Over_Close', 'OU_2_Under_Close', 'OU_2_Over_Open', 'OU_2_Under_Open',
+    'OU_2_25_Over_Close', 'OU_2_25_Under_Close', 'OU_2_25_Over_Open', 'OU_2_25_Under_Open',
+    'OU_2_5_Over_Close', 'OU_2_5_Under_Close', 'OU_2_5_Over_Open', 'OU_2_5_Under_Open',
+    'OU_2_75_Over_Close', 'OU_2_75_Under_Close', 'OU_2_75_Over_Open', 'OU_2_75_Under_Open',
+    'OU_3_Over_Close', 'OU_3_Under_Close', 'OU_3_Over_Open', 'OU_3_Under_Open',
+    'AH_0_Home_Close', 'AH_0_Away_Close', 'AH_0_Home_Open', 'AH_0_Away_Open',
+    'AH_minus_0_25_Home_Close', 'AH_minus_0_25_Away_Close', 'AH_minus_0_25_Home_Open', 'AH_minus_0_25_Away_Open',
+    'AH_minus_0_5_Home_Close', 'AH_minus_0_5_Away_Close', 'AH_minus_0_5_Home_Open', 'AH_minus_0_5_Away_Open',
+    'AH_minus_0_75_Home_Close', 'AH_minus_0_75_Away_Close', 'AH_minus_0_75_Home_Open', 'AH_minus_0_75_Away_Open',
+    'AH_minus_1_Home_Close', 'AH_minus_1_Away_Close', 'AH_minus_1_Home_Open', 'AH_minus_1_Away_Open',
+    'AH_minus_1_25_Home_Close', 'AH_minus_1_25_Away_Close', 'AH_minus_1_25_Home_Open', 'AH_minus_1_25_Away_Open',
+    'AH_plus_0_25_Home_Close', 'AH_plus_0_25_Away_Close', 'AH_plus_0_25_Home_Open', 'AH_plus_0_25_Away_Open',
+    'AH_plus_0_5_Home_Close', 'AH_plus_0_5_Away_Close', 'AH_plus_0_5_Home_Open', 'AH_plus_0_5_Away_Open',
+    'AH_plus_0_75_Home_Close', 'AH_plus_0_75_Away_Close', 'AH_plus_0_75_Home_Open', 'AH_plus_0_75_Away_Open',
+    'AH_plus_1_Home_Close', 'AH_plus_1_Away_Close', 'AH_plus_1_Home_Open', 'AH_plus_1_Away_Open',
+    'AH_plus_1_25_Home_Close', 'AH_plus_1_25_Away_Close', 'AH_plus_1_25_Home_Open', 'AH_plus_1_25_Away_Open',
+    'BTTS_Yes_Close', 'BTTS_No_Close', 'BTTS_Yes_Open', 'BTTS_No_Open'
+]
+
+# Market groups as (name, close columns, open columns)
+MARKETS = (
+    [('1X2', ['1X2_Close_1', '1X2_Close_X', '1X2_Close_2'], ['1X2_Open_1', '1X2_Open_X', '1X2_Open_2'])]
+    + [(f'OU_{ou_line_key(l)}',
+        [f'OU_{ou_line_key(l)}_Over_Close', f'OU_{ou_line_key(l)}_Under_Close'],
+        [f'OU_{ou_line_key(l)}_Over_Open', f'OU_{ou_line_key(l)}_Under_Open']) for l in OU_LINES]
+    + [(f'AH_{ah_line_key(l)}',
+        [f'AH_{ah_line_key(l)}_Home_Close', f'AH_{ah_line_key(l)}_Away_Close'],
+        [f'AH_{ah_line_key(l)}_Home_Open', f'AH_{ah_line_key(l)}_Away_Open']) for l in AH_LINES]
+    + [('BTTS', ['BTTS_Yes_Close', 'BTTS_No_Close'], ['BTTS_Yes_Open', 'BTTS_No_Open'])]
+)
+
+# Data-quality bounds (sum of inverse odds per market)
+OVERROUND_BOUNDS = {2: (0.97, 1.15), 3: (0.97, 1.20)}
+OPEN_CLOSE_MAX_RATIO = 2.5
+SIDE_ORDER_TOLERANCE = 0.95  # neighbouring lines may dip this much before it counts as swapped
+SEASON_FILE_RE = re.compile(r'^(.+)_(\d{4}(?:-\d{4})?)\.csv$')
+
+# Lean browser profile: block everything the scraper never reads.
+# LEAN_ALLOWLIST entries are either a category name ('fonts') which keeps the
+# whole category, or a substring ('hotjar.com') which unblocks matching patterns.
+LEAN_PROFILE = True
+LEAN_BLOCK = {
+    'images': ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico'],
+    'media': ['*.mp4', '*.webm', '*.m3u8', '*.mp3', '*.ogg'],
+    'fonts': ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot', '*fonts.googleapis.com*', '*fonts.gstatic.com*'],
+    'analytics': ['*google-analytics.com*', '*googletagmanager.com*', '*hotjar.com*',
+                  '*scorecardresearch.com*', '*quantserve.com*', '*clarity.ms*', '*facebook.net*'],
+    'ads': ['*doubleclick.net*', '*googlesyndication.com*', '*googleadservices.com*', '*adservice.google.*',
+            '*amazon-adsystem.com*', '*adnxs.com*', '*criteo.*', '*taboola.com*', '*outbrain.com*',
+            '*pubmatic.com*', '*rubiconproject.com*', '*casalemedia.com*'],
+}
+LEAN_ALLOWLIST = set()
+
+# Persistent per-worker Chrome profiles: consent cookie and HTTP disk cache
+# survive between matches and between runs.
+PERSISTENT_PROFILES = True
+PROFILE_ROOT = os.path.abspath('.chrome_profiles')
+PROFILE_CACHE_MB = 256
+CONSENT_COOKIE = 'OptanonAlertBoxClosed'
+
+_WORKER_SLOT = None  # set per pool process by init_worker
+_PROFILE_LOCKS = {}  # profile name -> (path, lock file) held for the life of the process
+_WORKER_DRIVER = None  # browser kept across tasks in a pool process
+_PREFETCHED = None  # (url, window handle) preloaded for this pool process's next task
+_THROTTLED = None  # watchdog event, set while the global memory budget throttles workers
+
+# Memory watchdog (needs psutil). Budgets are RSS of a worker's whole process
+# tree (worker + chromedriver + Chrome children) and of all workers together.
+WORKER_MEM_BUDGET_MB = 1500
+GLOBAL_MEM_BUDGET_MB = None  # None -> 80% of physical RAM
+WATCHDOG_INTERVAL = 2.0
+MAX_MATCH_RETRIES = 1
+
+# Shared work queue (--queue=<file.sqlite>; season CSVs are written next to it):
+# a lease must outlive the slowest match; owners renew it every
+# HEARTBEAT_INTERVAL seconds.
+LEASE_SECONDS = 300
+HEARTBEAT_INTERVAL = 30
+
+# Per-market partial results of matches that have not fully succeeded yet
+CHECKPOINT_DIR = os.path.abspath('.checkpoints')
+
+# Speculative prefetch: each pool task carries the URL submitted after it, which
+# loads in a background tab of the worker's browser during extraction.
+PREFETCH = True
+
+
+def lean_blocked_urls(allowlist=None):
+    """Return URL patterns for Network.setBlockedURLs after applying the allowlist."""
+    allow = LEAN_ALLOWLIST if allowlist is None else allowlist
+    blocked = []
+    for category, patterns in LEAN_BLOCK.items():
+        if category in allow:
+            continue
+        for p in patterns:
+            if not any(a in p for a in allow):
+                blocked.append(p)
+    return blocked
 
-def create_driver():
+
+def page_transfer_bytes(driver):
+    """Bytes transferred by the current page (navigation + resources, from Resource Timing)."""
+    try:
+        return driver.execute_script("""
+            var n = 0;
+            performance.getEntriesByType('navigation')
+                .concat(performance.getEntriesByType('resource'))
+                .forEach(function (e) { n += e.transferSize || 0; });
+            return n;
+        """) or 0
+    except:
+        return 0
+
+
+def init_worker(slots, throttled=None):
+    """ProcessPoolExecutor initializer: claim a profile slot for this process."""
+    global _WORKER_SLOT, _THROTTLED
+    _WORKER_SLOT = slots.get()
+    _THROTTLED = throttled
+    # Pool workers exit through multiprocessing, which skips atexit but runs finalizers
+    multiprocessing.util.Finalize(None, drop_worker_driver, exitpriority=10)
+
+
+def lock_file_nb(f):
+    """Take a non-blocking exclusive lock on an open file; OSError if it is held."""
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    elif msvcrt is not None:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+
+
+def profile_dir(name=None):
+    """Persistent user-data-dir for a worker slot (or 'main'), None if disabled.
+
+    The directory is locked for the life of the process. When another
+    process on this machine (e.g. a second --queue run) holds the slot, the
+    next free '<name>-2', '<name>-3', ... is used instead.
+    """
+    if not PERSISTENT_PROFILES:
+        return None
+    if name is None:
+        name = f"worker_{_WORKER_SLOT}" if _WORKER_SLOT is not None else 'main'
+    if name in _PROFILE_LOCKS:
+        return _PROFILE_LOCKS[name][0]
+    
+    os.makedirs(PROFILE_ROOT, exist_ok=True)
+    n = 1
+    while True:
+        path = os.path.join(PROFILE_ROOT, name if n == 1 else f"{name}-{n}")
+        lock = open(path + '.lock', 'a')
+        try:
+            lock_file_nb(lock)
+            break
+        except OSError:
+            lock.close()
+            n += 1
+    os.makedirs(path, exist_ok=True)
+    _PROFILE_LOCKS[name] = (path, lock)
+    
+    # We own the directory now, so Chrome singleton files in it are stale
+    for lock_file in ('SingletonLock', 'SingletonSocket', 'SingletonCookie'):
+        try:
+            os.remove(os.path.join(path, lock_file))
+        except OSError:
+            pass
+    return path
+
+
+def create_driver(lean=None, profile=None):
+    if lean is None:
+        lean = LEAN_PROFILE
     options = webdriver.ChromeOptions()
+    if profile:
+        options.add_argument(f'--user-data-dir={profile}')
+        options.add_argument(f'--disk-cache-size={PROFILE_CACHE_MB * 1024 * 1024}')
     options.add_argument('--headless')
     options.add_argument('--disable-gpu')
     options.add_argument('--no-sandbox')
@@ -33,15 +258,47 @@ def create_driver():
     options.add_argument('--disable-blink-features=AutomationControlled')
     options.add_experimental_option('excludeSwitches', ['enable-automation'])
     options.page_load_strategy = 'eager'
+    if PREFETCH:
+        # Let the prefetch tab keep loading at full speed in the background
+        options.add_argument('--disable-background-timer-throttling')
+        options.add_argument('--disable-renderer-backgrounding')
+        options.add_argument('--disable-backgrounding-occluded-windows')
+    if lean:
+        prefs = {}
+        if 'images' not in LEAN_ALLOWLIST:
+            prefs['profile.managed_default_content_settings.images'] = 2
+        if 'media' not in LEAN_ALLOWLIST:
+            options.add_argument('--autoplay-policy=user-gesture-required')
+        prefs['profile.managed_default_content_settings.notifications'] = 2
+        prefs['profile.managed_default_content_settings.geolocation'] = 2
+        options.add_experimental_option('prefs', prefs)
     
     driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+    driver.lean_profile = lean
+    apply_tab_settings(driver)
+    return driver
+
+
+def apply_tab_settings(driver):
+    """CDP overrides for the current tab (CDP commands only reach the tab that is current)."""
     driver.execute_cdp_cmd('Network.setUserAgentOverride', {
         'userAgent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
     })
-    return driver
+    if getattr(driver, 'lean_profile', LEAN_PROFILE):
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': lean_blocked_urls()})
+    # Default Resource Timing buffer (250 entries) is too small for page_transfer_bytes
+    driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
+        'source': 'performance.setResourceTimingBufferSize(5000);'
+    })
 
 
 def accept_cookies(driver):
+    try:
+        if driver.get_cookie(CONSENT_COOKIE):
+            return
+    except:
+        pass
     try:
         btn = WebDriverWait(driver, 5).until(
             EC.element_to_be_clickable((By.ID, "onetrust-accept-btn-handler"))
@@ -314,212 +571,676 @@ def expand_and_get_opening_pair(driver, actions, label_element):
         return '', ''
 
 
-def scrape_match(url, season, worker_id=1):
-    """Scrape match."""
-    driver = None
-    t0 = time.time()
+def scrape_info(driver, actions, data, only=None):
+    """Teams from the title; date and scores from the page text."""
+    body = driver.find_element(By.TAG_NAME, 'body').text
     
     try:
-        driver = create_driver()
-        driver.get(url)
-        time.sleep(1.5)
-        
-        accept_cookies(driver)
-        actions = ActionChains(driver)
-        
-        data = {}
-        data['League'] = LEAGUE_NAME
-        data['Season'] = season
-        data['URL'] = url
+        title = driver.title
+        m = re.search(r'^([^-|]+?)\s*[-–]+\s*([^-|]+?)(?:\s*[-|]|$)', title)
+        if m:
+            data['Home'] = m.group(1).strip()
+            away = m.group(2).strip()
+            away = re.sub(r'\s*(Odds|Predictions|H2H|Results|OddsPortal).*$', '', away, flags=re.I).strip()
+            data['Away'] = away
+    except:
+        pass
+    
+    m = re.search(r'(\d{1,2}\s+\w{3,}\s+\d{4})', body)
+    if m: data['Date'] = m.group(1)
+    
+    m = re.search(r'Final result\s*(\d+)\s*[-–:]\s*(\d+)', body, re.I)
+    if m: data['Final_Result'] = f"{m.group(1)}:{m.group(2)}"
+    
+    m = re.search(r'\((\d+)\s*[-–:,]\s*(\d+)', body)
+    if m: data['HT_Result'] = f"{m.group(1)}:{m.group(2)}"
+
+
+def scrape_1x2(driver, actions, data, only=None):
+    """1X2 closing odds from the first 3-odds row, opening odds by hover (only: sides to hover)."""
+    click_tab(driver, '1X2')
+    driver.execute_script("window.scrollBy(0, 200);")
+    time.sleep(0.3)
+    
+    all_odds = find_all_odds_elements(driver)
+    rows_3 = find_rows_with_n_odds(all_odds, 3)
+    
+    if rows_3:
+        row = rows_3[0]
+        for i, side in enumerate(('1', 'X', '2')):
+            data[f'1X2_Close_{side}'] = row[i]['v']
+        for i, side in enumerate(('1', 'X', '2')):
+            if only is None or side in only:
+                data[f'1X2_Open_{side}'] = hover_get_opening(driver, actions, row[i]['e'])
+
+
+def scrape_ou(driver, actions, data, only=None):
+    """O/U closing odds per line from the page text, opening odds from the expanded row (only: lines)."""
+    for line in (OU_LINES if only is None else only):
+        click_tab(driver, 'Over/Under')
+        driver.execute_script("window.scrollBy(0, 200);")
+        time.sleep(0.4)
         
         body = driver.find_element(By.TAG_NAME, 'body').text
         
-        # Info
-        try:
-            title = driver.title
-            m = re.search(r'^([^-|]+?)\s*[-–]+\s*([^-|]+?)(?:\s*[-|]|$)', title)
-            if m:
-                data['Home'] = m.group(1).strip()
-                away = m.group(2).strip()
-                away = re.sub(r'\s*(Odds|Predictions|H2H|Results|OddsPortal).*$', '', away, flags=re.I).strip()
-                data['Away'] = away
-        except:
-            pass
+        pattern = f"Over/Under +{line}"
+        over_c, under_c = parse_closing_from_body(body, pattern)
         
-        m = re.search(r'(\d{1,2}\s+\w{3,}\s+\d{4})', body)
-        if m: data['Date'] = m.group(1)
+        line_str = ou_line_key(line)
+        data[f'OU_{line_str}_Over_Close'] = over_c
+        data[f'OU_{line_str}_Under_Close'] = under_c
+        data[f'OU_{line_str}_Over_Open'] = ''
+        data[f'OU_{line_str}_Under_Open'] = ''
         
-        m = re.search(r'Final result\s*(\d+)\s*[-–:]\s*(\d+)', body, re.I)
-        if m: data['Final_Result'] = f"{m.group(1)}:{m.group(2)}"
-        
-        m = re.search(r'\((\d+)\s*[-–:,]\s*(\d+)', body)
-        if m: data['HT_Result'] = f"{m.group(1)}:{m.group(2)}"
-        
-        print(f"  [{worker_id}] {data.get('Home', '?')} vs {data.get('Away', '?')}", end=" | ", flush=True)
-        
-        # === 1X2 ===
-        click_tab(driver, '1X2')
+        if over_c and under_c:
+            label_els = driver.find_elements(By.XPATH, f"//p[contains(text(), 'Over/Under +{line}')]")
+            for label in label_els:
+                if label.is_displayed():
+                    over_open, under_open = expand_and_get_ou_opening_pair(driver, actions, label)
+                    if over_open and under_open:
+                        data[f'OU_{line_str}_Over_Open'] = over_open
+                        data[f'OU_{line_str}_Under_Open'] = under_open
+                    break
+
+
+def scrape_ah(driver, actions, data, only=None):
+    """AH closing odds per line from the page text, opening odds from the expanded row (only: lines)."""
+    for line in (AH_LINES if only is None else only):
+        click_tab(driver, 'Asian Handicap')
         driver.execute_script("window.scrollBy(0, 200);")
-        time.sleep(0.3)
+        time.sleep(0.4)
         
-        all_odds = find_all_odds_elements(driver)
-        rows_3 = find_rows_with_n_odds(all_odds, 3)
-        
-        if rows_3:
-            row = rows_3[0]
-            data['1X2_Close_1'] = row[0]['v']
-            data['1X2_Close_X'] = row[1]['v']
-            data['1X2_Close_2'] = row[2]['v']
-            data['1X2_Open_1'] = hover_get_opening(driver, actions, row[0]['e'])
-            data['1X2_Open_X'] = hover_get_opening(driver, actions, row[1]['e'])
-            data['1X2_Open_2'] = hover_get_opening(driver, actions, row[2]['e'])
-        print("1X2✓", end=" ", flush=True)
-        
-        # === O/U ===
-        ou_lines = [2, 2.25, 2.5, 2.75, 3]
-        
-        for line in ou_lines:
-            click_tab(driver, 'Over/Under')
-            driver.execute_script("window.scrollBy(0, 200);")
-            time.sleep(0.4)
-            
-            body = driver.find_element(By.TAG_NAME, 'body').text
-            
-            pattern = f"Over/Under +{line}"
-            over_c, under_c = parse_closing_from_body(body, pattern)
-            
-            line_str = str(line).replace('.', '_')
-            data[f'OU_{line_str}_Over_Close'] = over_c
-            data[f'OU_{line_str}_Under_Close'] = under_c
-            data[f'OU_{line_str}_Over_Open'] = ''
-            data[f'OU_{line_str}_Under_Open'] = ''
-            
-            if over_c and under_c:
-                label_els = driver.find_elements(By.XPATH, f"//p[contains(text(), 'Over/Under +{line}')]")
-                for label in label_els:
-                    if label.is_displayed():
-                        over_open, under_open = expand_and_get_ou_opening_pair(driver, actions, label)
-                        if over_open and under_open:
-                            data[f'OU_{line_str}_Over_Open'] = over_open
-                            data[f'OU_{line_str}_Under_Open'] = under_open
-                        break
+        body = driver.find_element(By.TAG_NAME, 'body').text
         
-        print("O/U✓", end=" ", flush=True)
+        if line == 0:
+            pattern = "Asian Handicap 0"
+            search_text = "Asian Handicap 0"
+        elif line > 0:
+            pattern = f"Asian Handicap +{line}"
+            search_text = f"Asian Handicap +{line}"
+        else:
+            pattern = f"Asian Handicap {line}"
+            search_text = f"Asian Handicap {line}"
         
-        # === AH ===
-        ah_lines = [0, -0.25, -0.5, -0.75, -1, -1.25, 0.25, 0.5, 0.75, 1, 1.25]
+        home_c, away_c = parse_closing_from_body(body, pattern)
         
-        for line in ah_lines:
-            click_tab(driver, 'Asian Handicap')
-            driver.execute_script("window.scrollBy(0, 200);")
-            time.sleep(0.4)
-            
-            body = driver.find_element(By.TAG_NAME, 'body').text
-            
-            if line == 0:
-                pattern = "Asian Handicap 0"
-                search_text = "Asian Handicap 0"
-            elif line > 0:
-                pattern = f"Asian Handicap +{line}"
-                search_text = f"Asian Handicap +{line}"
-            else:
-                pattern = f"Asian Handicap {line}"
-                search_text = f"Asian Handicap {line}"
-            
-            home_c, away_c = parse_closing_from_body(body, pattern)
-            
-            if line > 0:
-                line_str = f"plus_{str(line).replace('.', '_')}"
-            elif line < 0:
-                line_str = f"minus_{str(abs(line)).replace('.', '_')}"
-            else:
-                line_str = "0"
-            
-            data[f'AH_{line_str}_Home_Close'] = home_c
-            data[f'AH_{line_str}_Away_Close'] = away_c
-            data[f'AH_{line_str}_Home_Open'] = ''
-            data[f'AH_{line_str}_Away_Open'] = ''
-            
-            if home_c and away_c:
-                label_els = driver.find_elements(By.XPATH, f"//p[contains(text(), '{search_text}')]")
-                for label in label_els:
-                    if label.is_displayed():
-                        home_open, away_open = expand_and_get_opening_pair(driver, actions, label)
-                        if home_open and away_open:
-                            data[f'AH_{line_str}_Home_Open'] = home_open
-                            data[f'AH_{line_str}_Away_Open'] = away_open
-                        break
+        line_str = ah_line_key(line)
         
-        print("AH✓", end=" ", flush=True)
+        data[f'AH_{line_str}_Home_Close'] = home_c
+        data[f'AH_{line_str}_Away_Close'] = away_c
+        data[f'AH_{line_str}_Home_Open'] = ''
+        data[f'AH_{line_str}_Away_Open'] = ''
         
-        # === BTTS ===
-        click_tab(driver, 'Both Teams')
-        driver.execute_script("window.scrollBy(0, 200);")
-        time.sleep(0.5)
+        if home_c and away_c:
+            label_els = driver.find_elements(By.XPATH, f"//p[contains(text(), '{search_text}')]")
+            for label in label_els:
+                if label.is_displayed():
+                    home_open, away_open = expand_and_get_opening_pair(driver, actions, label)
+                    if home_open and away_open:
+                        data[f'AH_{line_str}_Home_Open'] = home_open
+                        data[f'AH_{line_str}_Away_Open'] = away_open
+                    break
+
+
+def scrape_btts(driver, actions, data, only=None):
+    """BTTS closing odds from odds cells, opening odds by hovering each cell (only: sides)."""
+    click_tab(driver, 'Both Teams')
+    driver.execute_script("window.scrollBy(0, 200);")
+    time.sleep(0.5)
+    
+    btts_cells = driver.find_elements(By.XPATH, "//div[contains(@class, 'odds-cell')]")
+    btts_odds = []
+    for el in btts_cells:
+        try:
+            t = el.text.strip()
+            if re.match(r'^\d+\.\d{2}$', t) and el.is_displayed():
+                loc = el.location
+                if 200 < loc['y'] < 900:
+                    btts_odds.append({'v': t, 'e': el, 'x': loc['x'], 'y': loc['y']})
+        except:
+            pass
+    
+    if btts_odds:
+        btts_odds.sort(key=lambda x: (x['y'], x['x']))
+        y_groups = {}
+        for o in btts_odds:
+            y_key = (o['y'] // 30) * 30
+            if y_key not in y_groups:
+                y_groups[y_key] = []
+            y_groups[y_key].append(o)
         
-        btts_cells = driver.find_elements(By.XPATH, "//div[contains(@class, 'odds-cell')]")
-        btts_odds = []
-        for el in btts_cells:
-            try:
-                t = el.text.strip()
-                if re.match(r'^\d+\.\d{2}$', t) and el.is_displayed():
-                    loc = el.location
-                    if 200 < loc['y'] < 900:
-                        btts_odds.append({'v': t, 'e': el, 'x': loc['x'], 'y': loc['y']})
-            except:
-                pass
+        rows_with_2 = []
+        for y in sorted(y_groups.keys()):
+            row = y_groups[y]
+            row.sort(key=lambda x: x['x'])
+            if len(row) >= 2:
+                rows_with_2.append(row[:2])
         
-        if btts_odds:
-            btts_odds.sort(key=lambda x: (x['y'], x['x']))
-            y_groups = {}
-            for o in btts_odds:
-                y_key = (o['y'] // 30) * 30
-                if y_key not in y_groups:
-                    y_groups[y_key] = []
-                y_groups[y_key].append(o)
+        if rows_with_2:
+            data['BTTS_Yes_Close'] = rows_with_2[0][0]['v']
+            data['BTTS_No_Close'] = rows_with_2[0][1]['v']
             
-            rows_with_2 = []
-            for y in sorted(y_groups.keys()):
-                row = y_groups[y]
-                row.sort(key=lambda x: x['x'])
-                if len(row) >= 2:
-                    rows_with_2.append(row[:2])
+            data['BTTS_Yes_Open'] = ''
+            data['BTTS_No_Open'] = ''
             
-            if rows_with_2:
-                data['BTTS_Yes_Close'] = rows_with_2[0][0]['v']
-                data['BTTS_No_Close'] = rows_with_2[0][1]['v']
-                
-                data['BTTS_Yes_Open'] = ''
-                data['BTTS_No_Open'] = ''
-                
-                # Hover na svaki element zasebno za opening odds
-                for row in rows_with_2[:5]:
-                    yes_open = expand_and_get_opening_single(driver, actions, row[0]['e'])
-                    no_open = expand_and_get_opening_single(driver, actions, row[1]['e'])
-                    if yes_open and no_open:
-                        data['BTTS_Yes_Open'] = yes_open
-                        data['BTTS_No_Open'] = no_open
+            # Hover na svaki element zasebno za opening odds
+            wanted = {'Yes', 'No'} if only is None else set(only)
+            for row in rows_with_2[:5]:
+                yes_open = expand_and_get_opening_single(driver, actions, row[0]['e']) if 'Yes' in wanted else ''
+                no_open = expand_and_get_opening_single(driver, actions, row[1]['e']) if 'No' in wanted else ''
+                if yes_open and no_open:
+                    data['BTTS_Yes_Open'] = yes_open
+                    data['BTTS_No_Open'] = no_open
+                    break
+                elif yes_open:
+                    data['BTTS_Yes_Open'] = yes_open
+                    if wanted == {'Yes'}:
+                        break
+                elif no_open:
+                    data['BTTS_No_Open'] = no_open
+                    if wanted == {'No'}:
                         break
-                    elif yes_open:
-                        data['BTTS_Yes_Open'] = yes_open
-                    elif no_open:
-                        data['BTTS_No_Open'] = no_open
+
+
+# Markets in scrape order; each is checkpointed separately
+MARKET_SCRAPERS = {
+    'info': scrape_info,
+    '1X2': scrape_1x2,
+    'O/U': scrape_ou,
+    'AH': scrape_ah,
+    'BTTS': scrape_btts,
+}
+
+
+def checkpoint_path(url, season, plan=None):
+    """Full scrapes and gap-fill runs (plan given) keep separate checkpoints."""
+    match_id = url.rstrip('/').split('/')[-1]
+    season_dir = os.path.join(CHECKPOINT_DIR, f"{OUTPUT_PREFIX}_{season}")
+    if plan is not None:
+        season_dir = os.path.join(season_dir, 'gaps')
+    return os.path.join(season_dir, f"{match_id}.json")
+
+
+def load_checkpoint(url, season, plan=None):
+    """Return (data, completed markets) saved for url by the same plan, or (None, set())."""
+    try:
+        with open(checkpoint_path(url, season, plan), encoding='utf-8') as f:
+            cp = json.load(f)
+        # A market finished under another plan may hold only some of its lines
+        if cp.get('plan') != json.loads(json.dumps(plan)):
+            return None, set()
+        return cp['data'], set(cp['done'])
+    except (OSError, ValueError, KeyError):
+        return None, set()
+
+
+def save_checkpoint(url, season, data, done, plan=None):
+    path = checkpoint_path(url, season, plan)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'data': data, 'done': sorted(done), 'plan': plan}, f)
+    os.replace(tmp, path)
+
+
+def clear_checkpoint(url, season, plan=None):
+    try:
+        os.remove(checkpoint_path(url, season, plan))
+    except OSError:
+        pass
+
+
+def scrape_match(url, season, worker_id=1, plan=None, driver=None):
+    """Scrape match, resuming from its per-market checkpoint.
+
+    Every market that completes is checkpointed, so a retry only navigates to
+    and extracts the markets that failed. plan ({market: lines/sides or None},
+    see gap_plan) limits the work to those markets; a checkpoint is only
+    resumed by a call with the same plan. Returns the row once all
+    markets have succeeded, otherwise None (the checkpoint is kept).
+    A driver passed in must already show url; it is left open for the caller.
+    """
+    own_driver = driver is None
+    t0 = time.time()
+    
+    data, done = load_checkpoint(url, season, plan)
+    if data is None:
+        data = {}
+        data['League'] = LEAGUE_NAME
+        data['Season'] = season
+        data['URL'] = url
+    failed = []
+    
+    try:
+        if own_driver:
+            driver = create_driver(profile=profile_dir())
+            driver.get(url)
+            time.sleep(1.5)
         
-        print("BTTS✓", end="", flush=True)
+        accept_cookies(driver)
+        actions = ActionChains(driver)
+        
+        if done:
+            print(f"  [{worker_id}] {data.get('Home', '?')} vs {data.get('Away', '?')} (resumed)", end=" | ", flush=True)
+        elif plan is not None and 'info' not in plan:
+            print(f"  [{worker_id}] {url}", end=" | ", flush=True)
+        for market, scraper in MARKET_SCRAPERS.items():
+            if market in done or (plan is not None and market not in plan):
+                continue
+            try:
+                scraper(driver, actions, data, None if plan is None else plan[market])
+            except Exception as e:
+                failed.append(market)
+                if market == 'info':
+                    print(f"  [{worker_id}] {url}", end=" | ", flush=True)
+                print(f"{market}✗", end=" ", flush=True)
+                continue
+            done.add(market)
+            save_checkpoint(url, season, data, done, plan)
+            if market == 'info':
+                print(f"  [{worker_id}] {data.get('Home', '?')} vs {data.get('Away', '?')}", end=" | ", flush=True)
+            else:
+                print(f"{market}✓", end=" ", flush=True)
         
         elapsed = time.time() - t0
-        print(f" | {elapsed:.1f}s")
+        kb = page_transfer_bytes(driver) / 1024
+        print(f"| {elapsed:.1f}s | {kb:.0f} KB")
         
+        if failed:
+            print(f"  [{worker_id}] incomplete, checkpointed (failed: {', '.join(failed)})")
+            return None
         return data
         
     except Exception as e:
         print(f"Error: {e}")
         return None
     finally:
-        if driver:
+        if own_driver and driver:
             driver.quit()
 
 
+class MemoryWatchdog:
+    """Sample RSS of every pool worker's process tree in a background thread.
+
+    A worker tree above the per-worker budget has its Chrome processes killed
+    (the match fails and is queued for retry). Above the global budget the
+    number of matches allowed in flight drops by one per sample; it climbs
+    back once usage is below 85% of the budget. While it is lowered the
+    throttled event is set, which makes workers quit their browser after each
+    match (see scrape_prefetched) so idle workers release their memory.
+    """
+
+    def __init__(self, max_workers, worker_budget_mb=None, global_budget_mb=None, interval=None):
+        self.enabled = psutil is not None
+        self.max_workers = max_workers
+        self.allowed = max_workers
+        self.interval = interval or WATCHDOG_INTERVAL
+        self.worker_budget = (worker_budget_mb or WORKER_MEM_BUDGET_MB) * 1024 * 1024
+        global_budget_mb = global_budget_mb or GLOBAL_MEM_BUDGET_MB
+        if global_budget_mb:
+            self.global_budget = global_budget_mb * 1024 * 1024
+        elif self.enabled:
+            self.global_budget = int(psutil.virtual_memory().total * 0.8)
+        else:
+            self.global_budget = None
+        self.peak_total = 0
+        self.peak_worker = 0
+        self.last_total = 0
+        self.recycled = 0
+        self.min_allowed = max_workers
+        self.throttled = multiprocessing.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if not self.enabled:
+            print("psutil not installed - memory watchdog disabled")
+            return self
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"  [watchdog] sample failed: {e}")
+
+    @staticmethod
+    def _tree_rss(proc):
+        rss = 0
+        try:
+            procs = [proc] + proc.children(recursive=True)
+        except psutil.NoSuchProcess:
+            return 0
+        for p in procs:
+            try:
+                rss += p.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+        return rss
+
+    def _recycle(self, worker):
+        """Kill the worker's browser tree; the worker itself survives."""
+        for child in worker.children(recursive=True):
+            try:
+                child.kill()
+            except psutil.NoSuchProcess:
+                pass
+        self.recycled += 1
+
+    def sample(self):
+        total = 0
+        for worker in psutil.Process().children():
+            rss = self._tree_rss(worker)
+            total += rss
+            self.peak_worker = max(self.peak_worker, rss)
+            if rss > self.worker_budget:
+                print(f"  [watchdog] worker {worker.pid} at {rss / 2**20:.0f} MB - recycling browser")
+                self._recycle(worker)
+        self.last_total = total
+        self.peak_total = max(self.peak_total, total)
+        if self.global_budget:
+            if total > self.global_budget and self.allowed > 1:
+                self.allowed -= 1
+                print(f"  [watchdog] {total / 2**20:.0f} MB in use - throttling to {self.allowed} workers")
+            elif total < self.global_budget * 0.85 and self.allowed < self.max_workers:
+                self.allowed += 1
+        if self.allowed < self.max_workers:
+            self.throttled.set()
+        else:
+            self.throttled.clear()
+        self.min_allowed = min(self.min_allowed, self.allowed)
+
+    def summary(self):
+        if not self.enabled:
+            return "Memory: watchdog disabled (psutil not installed)"
+        return (f"Memory: peak {self.peak_total / 2**20:.0f} MB total, "
+                f"{self.peak_worker / 2**20:.0f} MB per worker | "
+                f"{self.recycled} browser recycles | "
+                f"min concurrency {self.min_allowed}/{self.max_workers}")
+
+
+class WorkQueue:
+    """Match URLs shared through a SQLite file by any number of scraper processes.
+
+    claim() leases jobs to this process (host:pid) for LEASE_SECONDS and
+    heartbeat() renews them; a lease that runs out (crashed or hung process)
+    can be claimed by anyone. Finished rows are appended to the season CSV
+    while holding the database write lock, so processes never interleave
+    writes. The season CSV lives next to the queue file (output_file), so
+    hosts that mount the share at different paths still write the same file.
+    For several hosts the queue and CSV must live on a share with working
+    POSIX locks.
+    """
+
+    def __init__(self, path, owner=None, lease_seconds=None):
+        self.path = os.path.abspath(path)
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = lease_seconds or LEASE_SECONDS
+        self.max_attempts = MAX_MATCH_RETRIES + 1
+        self.db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                season TEXT NOT NULL,
+                url TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                owner TEXT,
+                lease_until REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                exported INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (season, url)
+            )""")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS outputs (
+                season TEXT PRIMARY KEY,
+                path TEXT NOT NULL
+            )""")
+
+    @contextmanager
+    def transaction(self):
+        self.db.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except:
+            self.db.execute('ROLLBACK')
+            raise
+        self.db.execute('COMMIT')
+
+    def output_file(self, season, default):
+        """Season CSV shared by all processes, resolved against this process's queue path.
+
+        The first caller records the file name of default; the file itself is
+        always placed in the queue file's directory.
+        """
+        with self.transaction():
+            self.db.execute("INSERT OR IGNORE INTO outputs (season, path) VALUES (?, ?)",
+                            (season, os.path.basename(default)))
+        return self._output_path(season)
+
+    def _output_path(self, season):
+        name = self.db.execute("SELECT path FROM outputs WHERE season = ?", (season,)).fetchone()[0]
+        return os.path.join(os.path.dirname(self.path), name)
+
+    def add(self, season, urls, retry_done=()):
+        """Queue urls for the season; returns how many became pending.
+
+        Unknown URLs are inserted and failed jobs among urls get a fresh set of
+        attempts. Finished jobs are only reopened when listed in retry_done.
+        """
+        with self.transaction():
+            before = self.count(season, 'pending')
+            self.db.executemany("INSERT OR IGNORE INTO jobs (season, url) VALUES (?, ?)",
+                                [(season, u) for u in urls])
+            reopen = """
+                UPDATE jobs SET status = 'pending', attempts = 0, owner = NULL, lease_until = NULL,
+                                result = NULL, exported = 0
+                WHERE season = ? AND url = ? AND status = ?"""
+            self.db.executemany(reopen, [(season, u, 'failed') for u in urls])
+            self.db.executemany(reopen, [(season, u, 'done') for u in retry_done])
+            return self.count(season, 'pending') - before
+
+    def active(self, season):
+        """Jobs still pending or leased, i.e. a run that is in progress."""
+        return self.db.execute("SELECT COUNT(*) FROM jobs WHERE season = ? AND status IN ('pending', 'leased')",
+                               (season,)).fetchone()[0]
+
+    def count(self, season, status=None):
+        if status is None:
+            return self.db.execute("SELECT COUNT(*) FROM jobs WHERE season = ?", (season,)).fetchone()[0]
+        return self.db.execute("SELECT COUNT(*) FROM jobs WHERE season = ? AND status = ?",
+                               (season, status)).fetchone()[0]
+
+    def urls(self, season, status=None):
+        if status is None:
+            rows = self.db.execute("SELECT url FROM jobs WHERE season = ? ORDER BY rowid", (season,))
+        else:
+            rows = self.db.execute("SELECT url FROM jobs WHERE season = ? AND status = ? ORDER BY rowid",
+                                   (season, status))
+        return [r[0] for r in rows]
+
+    def claim(self, season, limit):
+        """Lease up to limit pending (or expired) jobs to this process."""
+        if limit <= 0:
+            return []
+        now = time.time()
+        with self.transaction():
+            self.db.execute("""
+                UPDATE jobs SET status = 'failed', owner = NULL, lease_until = NULL
+                WHERE season = ? AND status = 'leased' AND lease_until < ? AND attempts >= ?""",
+                (season, now, self.max_attempts))
+            rows = self.db.execute("""
+                SELECT url FROM jobs
+                WHERE season = ? AND (status = 'pending' OR (status = 'leased' AND lease_until < ?))
+                ORDER BY attempts, rowid LIMIT ?""", (season, now, limit)).fetchall()
+            urls = [r[0] for r in rows]
+            self.db.executemany("""
+                UPDATE jobs SET status = 'leased', owner = ?, lease_until = ?, attempts = attempts + 1
+                WHERE season = ? AND url = ?""",
+                [(self.owner, now + self.lease_seconds, season, u) for u in urls])
+        return urls
+
+    def heartbeat(self, season, urls):
+        """Extend this process's leases on urls."""
+        until = time.time() + self.lease_seconds
+        with self.transaction():
+            self.db.executemany("""
+                UPDATE jobs SET lease_until = ?
+                WHERE season = ? AND url = ? AND owner = ? AND status = 'leased'""",
+                [(until, season, u, self.owner) for u in urls])
+
+    def complete(self, season, url, data):
+        with self.transaction():
+            self.db.execute("""
+                UPDATE jobs SET status = 'done', result = ?, owner = ?, lease_until = NULL
+                WHERE season = ? AND url = ? AND status != 'done'""",
+                (json.dumps(data), self.owner, season, url))
+
+    def release(self, season, url):
+        """Give a failed job back; returns its new status ('pending' or 'failed')."""
+        with self.transaction():
+            self.db.execute("""
+                UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                                owner = NULL, lease_until = NULL
+                WHERE season = ? AND url = ? AND owner = ? AND status = 'leased'""",
+                (self.max_attempts, season, url, self.owner))
+            row = self.db.execute("SELECT status FROM jobs WHERE season = ? AND url = ?",
+                                  (season, url)).fetchone()
+        return row[0] if row else None
+
+    def export(self, season, fieldnames):
+        """Append finished, not yet exported rows to the season CSV; returns the count."""
+        with self.transaction():
+            output_file = self._output_path(season)
+            rows = self.db.execute("""
+                SELECT url, result FROM jobs
+                WHERE season = ? AND status = 'done' AND exported = 0 ORDER BY rowid""",
+                (season,)).fetchall()
+            if rows:
+                new_file = not os.path.exists(output_file) or os.path.getsize(output_file) == 0
+                with open(output_file, 'a', newline='', encoding='utf-8') as f:
+                    writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
+                    if new_file:
+                        writer.writeheader()
+                    for _, result in rows:
+                        writer.writerow(json.loads(result))
+                self.db.executemany("UPDATE jobs SET exported = 1 WHERE season = ? AND url = ?",
+                                    [(season, url) for url, _ in rows])
+        return len(rows)
+
+    def close(self):
+        self.db.close()
+
+
+def prefetch_match(driver, url):
+    """Start loading url in a new background tab; returns its window handle.
+
+    new_window gives a separate browsing context (no opener), so the preload
+    does not run on the renderer thread of the page being extracted. The tab
+    gets the same CDP settings before navigating.
+    """
+    current = driver.current_window_handle
+    driver.switch_to.new_window('tab')
+    handle = driver.current_window_handle
+    apply_tab_settings(driver)
+    driver.execute_script("window.location = arguments[0];", url)
+    # Back to the current tab so hovers and tooltips still render
+    driver.switch_to.window(current)
+    return handle
+
+
+def switch_to_prefetched(driver, handle, timeout=30):
+    """Close the current tab and continue in the prefetched one once it is usable."""
+    driver.close()
+    driver.switch_to.window(handle)
+    WebDriverWait(driver, timeout).until(
+        lambda d: d.execute_script("return document.readyState") != 'loading'
+    )
+
+
+def discard_prefetched(driver, handle):
+    """Close a prefetched tab that is not needed and return to the current one."""
+    current = driver.current_window_handle
+    driver.switch_to.window(handle)
+    driver.close()
+    driver.switch_to.window(current)
+
+
+def driver_alive(driver):
+    try:
+        driver.window_handles
+        return True
+    except:
+        return False
+
+
+def worker_driver():
+    """This process's long-lived browser, replaced if it has died."""
+    global _WORKER_DRIVER
+    if _WORKER_DRIVER is not None and not driver_alive(_WORKER_DRIVER):
+        drop_worker_driver()
+    if _WORKER_DRIVER is None:
+        _WORKER_DRIVER = create_driver(profile=profile_dir())
+    return _WORKER_DRIVER
+
+
+def drop_worker_driver():
+    global _WORKER_DRIVER, _PREFETCHED
+    if _WORKER_DRIVER is not None:
+        try:
+            _WORKER_DRIVER.quit()
+        except:
+            pass
+    _WORKER_DRIVER = None
+    _PREFETCHED = None
+
+
+def throttled():
+    return _THROTTLED is not None and _THROTTLED.is_set()
+
+
+def scrape_prefetched(url, season, worker_id=1, plan=None, next_url=None):
+    """Scrape url in this process's browser while next_url preloads in a background tab.
+
+    The browser outlives the task (see worker_driver). The main process
+    submits next_url as soon as this task returns, normally to this very
+    worker; if another task arrives first, the preloaded tab is discarded
+    and the page loads as usual. While the watchdog throttles, nothing is
+    preloaded and the browser is quit after the task so idle workers do not
+    hold memory. Returns the row or None.
+    """
+    global _PREFETCHED
+    try:
+        driver = worker_driver()
+        prefetched, _PREFETCHED = _PREFETCHED, None
+        if prefetched and prefetched[0] == url:
+            switch_to_prefetched(driver, prefetched[1])
+        else:
+            if prefetched:
+                discard_prefetched(driver, prefetched[1])
+            driver.get(url)
+            time.sleep(1.5)
+        if PREFETCH and next_url and not throttled():
+            _PREFETCHED = (next_url, prefetch_match(driver, next_url))
+    except Exception as e:
+        print(f"  [{worker_id}] Error loading {url}: {e}")
+        drop_worker_driver()
+        return None
+    
+    data = scrape_match(url, season, worker_id, plan, driver=driver)
+    # A dead browser (crash, watchdog recycle) is replaced for the next match
+    if throttled() or (data is None and not driver_alive(driver)):
+        drop_worker_driver()
+    return data
+
+
 def collect_urls_from_page(driver, season):
     """Collect all match URLs from current page."""
     urls = set()
@@ -563,7 +1284,7 @@ def get_available_seasons(league_slug):
     """Return list of available season strings for a league (e.g. '2024-2025')."""
     driver = None
     try:
-        driver = create_driver()
+        driver = create_driver(profile=profile_dir())
         url = f"https://www.oddsportal.com/football/{league_slug}/results/"
         driver.get(url)
         accept_cookies(driver)
@@ -602,7 +1323,7 @@ def get_season_match_urls(season):
     """Get all match URLs for season - including all pagination pages."""
     driver = None
     try:
-        driver = create_driver()
+        driver = create_driver(profile=profile_dir())
         base_url = f"https://www.oddsportal.com/football/{LEAGUE_SLUG}-{season}/results/"
         driver.get(base_url)
         accept_cookies(driver)
@@ -693,48 +1414,43 @@ def get_season_match_urls(season):
             driver.quit()
 
 
-def scrape_season(season, num_workers=8):
-    """Scrape entire season with multiprocessing and save results continuously."""
-    import threading
-    
+def scrape_season(season, num_workers=8, queue_path=None):
+    """Scrape entire season with multiprocessing and save results continuously.
+
+    With queue_path, matches are claimed from a shared WorkQueue so several
+    processes (or hosts) can work on the same season and output file.
+    """
     print(f"\n{'='*60}")
     print(f"Scraping {LEAGUE_NAME} - Season {season}")
     print("="*60)
     
-    # Get all match URLs
-    print("Getting match URLs...")
-    urls = get_season_match_urls(season)
-    print(f"Found {len(urls)} matches")
-    
-    if not urls:
-        print("No matches found!")
-        return
-    
     # Output file (use absolute path and robust header creation)
     output_file = os.path.abspath(f"{OUTPUT_PREFIX}_{season}.csv")
     
-    # Define fixed fieldnames in correct order
-    fieldnames = [
-        'League', 'Season', 'URL', 'Home', 'Away', 'Date', 'Final_Result', 'HT_Result',
-        '1X2_Close_1', '1X2_Close_X', '1X2_Close_2', '1X2_Open_1', '1X2_Open_X', '1X2_Open_2',
-        'OU_2_Over_Close', 'OU_2_Under_Close', 'OU_2_Over_Open', 'OU_2_Under_Open',
-        'OU_2_25_Over_Close', 'OU_2_25_Under_Close', 'OU_2_25_Over_Open', 'OU_2_25_Under_Open',
-        'OU_2_5_Over_Close', 'OU_2_5_Under_Close', 'OU_2_5_Over_Open', 'OU_2_5_Under_Open',
-        'OU_2_75_Over_Close', 'OU_2_75_Under_Close', 'OU_2_75_Over_Open', 'OU_2_75_Under_Open',
-        'OU_3_Over_Close', 'OU_3_Under_Close', 'OU_3_Over_Open', 'OU_3_Under_Open',
-        'AH_0_Home_Close', 'AH_0_Away_Close', 'AH_0_Home_Open', 'AH_0_Away_Open',
-        'AH_minus_0_25_Home_Close', 'AH_minus_0_25_Away_Close', 'AH_minus_0_25_Home_Open', 'AH_minus_0_25_Away_Open',
-        'AH_minus_0_5_Home_Close', 'AH_minus_0_5_Away_Close', 'AH_minus_0_5_Home_Open', 'AH_minus_0_5_Away_Open',
-        'AH_minus_0_75_Home_Close', 'AH_minus_0_75_Away_Close', 'AH_minus_0_75_Home_Open', 'AH_minus_0_75_Away_Open',
-        'AH_minus_1_Home_Close', 'AH_minus_1_Away_Close', 'AH_minus_1_Home_Open', 'AH_minus_1_Away_Open',
-        'AH_minus_1_25_Home_Close', 'AH_minus_1_25_Away_Close', 'AH_minus_1_25_Home_Open', 'AH_minus_1_25_Away_Open',
-        'AH_plus_0_25_Home_Close', 'AH_plus_0_25_Away_Close', 'AH_plus_0_25_Home_Open', 'AH_plus_0_25_Away_Open',
-        'AH_plus_0_5_Home_Close', 'AH_plus_0_5_Away_Close', 'AH_plus_0_5_Home_Open', 'AH_plus_0_5_Away_Open',
-        'AH_plus_0_75_Home_Close', 'AH_plus_0_75_Away_Close', 'AH_plus_0_75_Home_Open', 'AH_plus_0_75_Away_Open',
-        'AH_plus_1_Home_Close', 'AH_plus_1_Away_Close', 'AH_plus_1_Home_Open', 'AH_plus_1_Away_Open',
-        'AH_plus_1_25_Home_Close', 'AH_plus_1_25_Away_Close', 'AH_plus_1_25_Home_Open', 'AH_plus_1_25_Away_Open',
-        'BTTS_Yes_Close', 'BTTS_No_Close', 'BTTS_Yes_Open', 'BTTS_No_Open'
-    ]
+    fieldnames = FIELDNAMES
+    
+    # Only join without listing while another run still has work queued;
+    # a queue left over by a finished run is re-seeded like a fresh one
+    work_queue = WorkQueue(queue_path) if queue_path else None
+    joined = False
+    if work_queue:
+        output_file = work_queue.output_file(season, output_file)
+        work_queue.export(season, fieldnames)
+        joined = work_queue.active(season) > 0
+    
+    if joined:
+        urls = work_queue.urls(season)
+        print(f"Joining shared queue {work_queue.path}: {len(urls)} jobs "
+              f"({work_queue.count(season, 'done')} done)")
+    else:
+        # Get all match URLs
+        print("Getting match URLs...")
+        urls = get_season_match_urls(season)
+        print(f"Found {len(urls)} matches")
+        
+        if not urls:
+            print("No matches found!")
+            return
     
     # Create or resume CSV (skip already scraped matches)
     print(f"\nSaving results to: {output_file}")
@@ -758,16 +1474,27 @@ def scrape_season(season, num_workers=8):
             scraped_urls = set()
             existing_count = 0
 
+    # URLs flagged by validate_season_files are scraped again
+    queued_urls = [] if joined else read_rescrape_queue(output_file)
+    if queued_urls:
+        print(f"{len(queued_urls)} matches queued for rescrape")
+    
     # Filter out already-scraped URLs
-    remaining_urls = [u for u in urls if u not in scraped_urls]
+    remaining_urls = queued_urls + [u for u in urls if u not in scraped_urls and u not in queued_urls]
+    if work_queue:
+        if not joined:
+            work_queue.add(season, remaining_urls, retry_done=queued_urls)
+        remaining_urls = work_queue.urls(season, 'pending') + work_queue.urls(season, 'leased')
     print(f"{len(remaining_urls)} matches remaining to scrape (out of {len(urls)})")
 
     if not remaining_urls:
         print("All matches already scraped — nothing to do.")
         return
 
-    # Ensure header exists (create if missing)
-    if not os.path.exists(output_file):
+    # Ensure header exists (create if missing); queue mode writes it on export
+    if work_queue:
+        print(f"Shared queue exports to -> {output_file}")
+    elif not os.path.exists(output_file):
         try:
             with open(output_file, 'w', newline='', encoding='utf-8') as f:
                 writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
@@ -783,13 +1510,67 @@ def scrape_season(season, num_workers=8):
     file_lock = threading.Lock()
     results_count = existing_count if 'existing_count' in locals() else 0
     
-    # Scrape matches
-    with ProcessPoolExecutor(max_workers=num_workers) as executor:
-        futures = {executor.submit(scrape_match, url, season, i % num_workers + 1): url for i, url in enumerate(remaining_urls)}
-        for i, future in enumerate(as_completed(futures)):
-            url = futures[future]
-            try:
-                data = future.result()
+    pending = deque(remaining_urls)
+    
+    def claim(n):
+        if work_queue:
+            return work_queue.claim(season, n)
+        return [pending.popleft() for _ in range(min(n, len(pending)))]
+    
+    # Scrape matches, keeping at most watchdog.allowed in flight. Each task is
+    # also given the URL claimed after it to preload; that URL is held back in
+    # hinted until the task returns and then submitted ahead of new claims.
+    slots = multiprocessing.Queue()
+    for slot in range(1, num_workers + 1):
+        slots.put(slot)
+    watchdog = MemoryWatchdog(num_workers).start()
+    attempts = {}
+    in_flight = {}
+    hinted = deque()
+    submitted = 0
+    rescraped = set()
+    last_heartbeat = time.time()
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=init_worker,
+                             initargs=(slots, watchdog.throttled)) as executor:
+        def submit():
+            nonlocal submitted
+            while len(in_flight) < watchdog.allowed:
+                url = hinted.popleft() if hinted else next(iter(claim(1)), None)
+                if url is None:
+                    break
+                next_url = next(iter(claim(1)), None) if PREFETCH else None
+                attempts[url] = attempts.get(url, 0) + 1
+                future = executor.submit(scrape_prefetched, url, season, submitted % num_workers + 1,
+                                         None, next_url)
+                in_flight[future] = (url, next_url)
+                submitted += 1
+        
+        while True:
+            submit()
+            
+            if not in_flight:
+                # Other processes may still hold leases that could expire and come back
+                if work_queue and work_queue.count(season, 'leased'):
+                    time.sleep(WATCHDOG_INTERVAL)
+                    continue
+                break
+            
+            if work_queue and time.time() - last_heartbeat > HEARTBEAT_INTERVAL:
+                work_queue.heartbeat(season, [u for job in in_flight.values() for u in job if u] + list(hinted))
+                last_heartbeat = time.time()
+            
+            done, _ = wait(in_flight, timeout=WATCHDOG_INTERVAL, return_when=FIRST_COMPLETED)
+            finished = [(future, in_flight.pop(future)) for future in done]
+            # Preloaded URLs go out to the now idle workers before results are saved
+            hinted.extend(next_url for _, (_, next_url) in finished if next_url)
+            submit()
+            for future, (url, _) in finished:
+                try:
+                    data = future.result()
+                except Exception as e:
+                    print(f"[{results_count}/{len(urls)}] ✗ Error: {e}")
+                    data = None
+                
                 if data:
                     # Ensure all fields exist with default empty string
                     for field in fieldnames:
@@ -798,24 +1579,517 @@ def scrape_season(season, num_workers=8):
                     
                     # Save immediately to CSV
                     with file_lock:
-                        with open(output_file, 'a', newline='', encoding='utf-8') as f:
-                            writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
-                            writer.writerow(data)
+                        if work_queue:
+                            work_queue.complete(season, url, data)
+                            work_queue.export(season, fieldnames)
+                        else:
+                            with open(output_file, 'a', newline='', encoding='utf-8') as f:
+                                writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
+                                writer.writerow(data)
                         
-                        results_count += 1
+                        clear_checkpoint(url, season)
+                        if url not in scraped_urls:
+                            results_count += 1
                         print(f"[{results_count}/{len(urls)}] ✓ {data.get('Home', '?')} vs {data.get('Away', '?')}")
-                        
-            except Exception as e:
-                print(f"[{i+1}/{len(urls)}] ✗ Error: {e}")
+                    if url in queued_urls:
+                        rescraped.add(url)
+                elif work_queue:
+                    status = work_queue.release(season, url)
+                    print(f"  ↻ requeued {url}" if status == 'pending' else f"  ✗ gave up on {url} ({status})")
+                elif attempts[url] <= MAX_MATCH_RETRIES:
+                    print(f"  ↻ requeued {url}")
+                    pending.append(url)
+                else:
+                    print(f"  ✗ gave up on {url} after {attempts[url]} attempts")
+    watchdog.stop()
+    
+    if queued_urls:
+        if work_queue:
+            with work_queue.transaction():
+                rewrite_last_row_per_url(output_file, fieldnames)
+            rescraped = set(work_queue.urls(season, 'done'))
+        else:
+            rewrite_last_row_per_url(output_file, fieldnames)
+        write_rescrape_queue(output_file, [u for u in queued_urls if u not in rescraped])
+        print(f"Rescraped {len(rescraped & set(queued_urls))}/{len(queued_urls)} queued matches")
+    
+    if work_queue:
+        print(f"Queue: {work_queue.count(season, 'done')} done, {work_queue.count(season, 'failed')} failed")
+        work_queue.close()
     
     # Final summary
     print(f"\n{'='*60}")
     print(f"SUCCESS: Saved {results_count} matches to {output_file}")
+    print(watchdog.summary())
     print("="*60)
     
     return results_count
 
 
+def season_files(directory='.'):
+    """All '<prefix>_<season>.csv' files in directory, sorted."""
+    return sorted(p for p in glob.glob(os.path.join(directory, '*.csv'))
+                  if SEASON_FILE_RE.match(os.path.basename(p)))
+
+
+def load_season_table(path):
+    """Read a season CSV into {column: numpy str array} (missing columns are blank)."""
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        rows = [r + [''] * (len(header) - len(r)) if len(r) < len(header) else r[:len(header)] for r in reader]
+    table = np.array(rows, dtype=str).reshape(len(rows), len(header))
+    n = len(rows)
+    cols = {h: table[:, i] for i, h in enumerate(header)}
+    for h in FIELDNAMES:
+        if h not in cols:
+            cols[h] = np.full(n, '', dtype=str)
+    return cols
+
+
+def load_all_seasons(paths):
+    """Concatenate season tables; adds a '_file' column with the source index."""
+    tables = [load_season_table(p) for p in paths]
+    cols = {h: np.concatenate([t[h] for t in tables]) if tables else np.array([], dtype=str)
+            for h in FIELDNAMES}
+    cols['_file'] = np.concatenate([np.full(len(t['URL']), i) for i, t in enumerate(tables)]) \
+        if tables else np.array([], dtype=int)
+    return cols
+
+
+def odds_array(col):
+    """Str column -> float array, NaN where blank or unparseable."""
+    out = np.full(col.shape, np.nan)
+    mask = np.char.str_len(col) > 0
+    try:
+        out[mask] = col[mask].astype(float)
+    except ValueError:
+        for i in np.flatnonzero(mask):
+            try:
+                out[i] = float(col[i])
+            except ValueError:
+                pass
+    return out
+
+
+def score_arrays(col):
+    """'2:1' column -> (home goals, away goals, well-formed mask); NaN where malformed."""
+    parts = np.char.partition(col, ':')
+    ok = (parts[:, 1] == ':') & np.char.isdigit(parts[:, 0]) & np.char.isdigit(parts[:, 2])
+    home = np.full(col.shape, np.nan)
+    away = np.full(col.shape, np.nan)
+    home[ok] = parts[ok, 0].astype(float)
+    away[ok] = parts[ok, 2].astype(float)
+    return home, away, ok
+
+
+def validate_table(cols, season_by_file=None):
+    """Run vectorized checks; returns {check name: bool mask of suspect rows}."""
+    n = len(cols['URL'])
+    checks = {}
+    
+    def flag(name, mask):
+        checks[name] = checks.get(name, np.zeros(n, dtype=bool)) | mask
+    
+    for name, close_cols, open_cols in MARKETS:
+        close = np.vstack([odds_array(cols[c]) for c in close_cols])
+        opening = np.vstack([odds_array(cols[c]) for c in open_cols])
+        lo, hi = OVERROUND_BOUNDS[len(close_cols)]
+        for kind, odds in (('close', close), ('open', opening)):
+            present = ~np.isnan(odds)
+            full = present.all(axis=0)
+            flag(f'partial_{kind}', present.any(axis=0) & ~full)
+            flag(f'odds_le_1_{kind}', (odds <= 1.0).any(axis=0))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                overround = (1.0 / odds).sum(axis=0)
+            flag(f'overround_{kind}', full & ((overround < lo) | (overround > hi)))
+        flag('open_without_close', (~np.isnan(opening) & np.isnan(close)).any(axis=0))
+        with np.errstate(invalid='ignore'):
+            ratio = opening / close
+            flag('open_close_ratio', ((ratio > OPEN_CLOSE_MAX_RATIO) | (ratio < 1 / OPEN_CLOSE_MAX_RATIO)).any(axis=0))
+    
+    # Over odds rise with the O/U line and home odds rise as the AH line drops;
+    # a break between neighbouring quoted lines means sides were swapped
+    for lines, column in ((sorted(OU_LINES), lambda l: f'OU_{ou_line_key(l)}_Over_Close'),
+                          (sorted(AH_LINES, reverse=True), lambda l: f'AH_{ah_line_key(l)}_Home_Close')):
+        odds = np.vstack([odds_array(cols[column(l)]) for l in lines])
+        with np.errstate(invalid='ignore'):
+            flag('side_order_close', (odds[1:] < odds[:-1] * SIDE_ORDER_TOLERANCE).any(axis=0))
+    
+    ft_h, ft_a, ft_ok = score_arrays(cols['Final_Result'])
+    ht_h, ht_a, ht_ok = score_arrays(cols['HT_Result'])
+    ft_blank = np.char.str_len(cols['Final_Result']) == 0
+    ht_blank = np.char.str_len(cols['HT_Result']) == 0
+    flag('score_format', (~ft_ok & ~ft_blank) | (~ht_ok & ~ht_blank))
+    flag('ft_missing', ft_blank)
+    flag('ht_missing', ht_blank)
+    flag('ht_exceeds_ft', ft_ok & ht_ok & ((ht_h > ft_h) | (ht_a > ft_a)))
+    flag('info_missing', (np.char.str_len(cols['Home']) == 0) | (np.char.str_len(cols['Away']) == 0)
+         | (np.char.str_len(cols['Date']) == 0))
+    
+    # Duplicate URL within the same file (every occurrence after the first)
+    keys = np.char.add(np.char.add(cols['_file'].astype(str), '|'), cols['URL'])
+    _, first = np.unique(keys, return_index=True)
+    dup = np.ones(n, dtype=bool)
+    dup[first] = False
+    flag('duplicate_url', dup)
+    
+    if season_by_file is not None:
+        expected = np.char.add(np.char.add('-', np.asarray(season_by_file, dtype=str)[cols['_file']]), '/')
+        flag('season_mismatch', np.char.find(cols['URL'], expected) < 0)
+    return checks
+
+
+def fill_rates(cols):
+    """Share of non-blank values per output column."""
+    n = max(len(cols['URL']), 1)
+    return {h: float((np.char.str_len(cols[h]) > 0).sum()) / n for h in FIELDNAMES}
+
+
+# Match-level defects worth a full rescrape. Everything else is report-only:
+# opening-odds problems and a blank HT_Result come from extractors that would
+# repeat them on a rescrape (blank cells are repaired by --fill-gaps), and
+# season_mismatch is a wrong URL list, which no rescrape fixes.
+RESCRAPE_CHECKS = {
+    'partial_close', 'odds_le_1_close', 'overround_close', 'side_order_close',
+    'score_format', 'ft_missing', 'ht_exceeds_ft', 'info_missing', 'duplicate_url',
+}
+
+
+def rescrape_queue_path(output_file):
+    return output_file[:-len('.csv')] + '_rescrape.txt'
+
+
+def read_rescrape_queue(output_file):
+    path = rescrape_queue_path(output_file)
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def write_rescrape_queue(output_file, urls):
+    path = rescrape_queue_path(output_file)
+    if urls:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(urls) + '\n')
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def rewrite_last_row_per_url(output_file, fieldnames):
+    """Rewrite CSV keeping one row per URL (the newest) at its original position."""
+    rows = {}
+    with open(output_file, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            rows[row.get('URL', '')] = row
+    tmp = output_file + '.tmp'
+    with open(tmp, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows.values())
+    os.replace(tmp, output_file)
+
+
+def validate_season_files(directory='.', queue=True):
+    """Validate every season CSV and (optionally) queue suspect URLs for rescrape."""
+    if np is None:
+        print("numpy not installed - validation unavailable")
+        return {}
+    paths = season_files(directory)
+    if not paths:
+        print("No season files found.")
+        return {}
+    
+    t0 = time.time()
+    cols = load_all_seasons(paths)
+    t1 = time.time()
+    seasons = [SEASON_FILE_RE.match(os.path.basename(p)).group(2) for p in paths]
+    checks = validate_table(cols, seasons)
+    rates = fill_rates(cols)
+    t2 = time.time()
+    
+    n = len(cols['URL'])
+    print(f"Validated {n} rows in {len(paths)} files (load {t1 - t0:.3f}s, checks {t2 - t1:.3f}s)")
+    print("\nChecks:")
+    for name, mask in checks.items():
+        note = "" if name in RESCRAPE_CHECKS else " (report only)"
+        print(f"  {name:<20} {int(mask.sum()):>6}{note}")
+    print("\nFill rates:")
+    for h, r in rates.items():
+        if r < 1.0:
+            print(f"  {h:<28} {r:6.1%}")
+    
+    suspect = np.zeros(n, dtype=bool)
+    for name, mask in checks.items():
+        if name in RESCRAPE_CHECKS:
+            suspect |= mask
+    
+    print("\nSuspect matches:")
+    queued = {}
+    for i, path in enumerate(paths):
+        in_file = suspect & (cols['_file'] == i)
+        urls = list(dict.fromkeys(u for u in cols['URL'][in_file] if u))
+        queued[path] = urls
+        print(f"  {os.path.basename(path):<36} {len(urls):>5} / {int((cols['_file'] == i).sum())}")
+        if queue:
+            write_rescrape_queue(path, urls)
+    if queue:
+        print("\nQueued for rescrape (picked up by the next run of each season).")
+    print("Blank opening odds and HT results are repaired cell by cell with --fill-gaps.")
+    return queued
+
+
+GAP_INFO_FIELDS = ['Home', 'Away', 'Date', 'Final_Result', 'HT_Result']
+
+
+def gap_plan(row):
+    """Work out what is blank in an existing CSV row, as a scrape_match plan.
+
+    Maps market -> None (scrape the whole market) or the lines/sides that
+    still need opening odds. O/U and AH lines without closing odds were not
+    offered, so they are only retried when the whole market is blank.
+    """
+    plan = {}
+    if any(not row.get(f) for f in GAP_INFO_FIELDS):
+        plan['info'] = None
+    
+    for market, close_col, open_col, sides in (
+            ('1X2', '1X2_Close_{}', '1X2_Open_{}', ('1', 'X', '2')),
+            ('BTTS', 'BTTS_{}_Close', 'BTTS_{}_Open', ('Yes', 'No'))):
+        if not all(row.get(close_col.format(sd)) for sd in sides):
+            plan[market] = None
+        else:
+            missing = [sd for sd in sides if not row.get(open_col.format(sd))]
+            if missing:
+                plan[market] = missing
+    
+    for market, lines, key, (side_a, side_b), col in (
+            ('O/U', OU_LINES, ou_line_key, ('Over', 'Under'), 'OU'),
+            ('AH', AH_LINES, ah_line_key, ('Home', 'Away'), 'AH')):
+        quoted = []
+        missing = []
+        for line in lines:
+            k = f"{col}_{key(line)}"
+            if row.get(f'{k}_{side_a}_Close') and row.get(f'{k}_{side_b}_Close'):
+                quoted.append(line)
+                if not (row.get(f'{k}_{side_a}_Open') and row.get(f'{k}_{side_b}_Open')):
+                    missing.append(line)
+        if not quoted:
+            plan[market] = None
+        elif missing:
+            plan[market] = missing
+    return plan
+
+
+def merge_blank_cells(row, data):
+    """Copy non-blank values from data into blank cells of row; returns how many."""
+    filled = 0
+    for k, v in data.items():
+        if k in row and not row[k] and v:
+            row[k] = v
+            filled += 1
+    return filled
+
+
+def write_rows(path, fieldnames, rows):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp, path)
+
+
+def fill_season_gaps(path, num_workers=8):
+    """Scrape only the blank cells of an existing season file and rewrite it in place."""
+    m = SEASON_FILE_RE.match(os.path.basename(path))
+    if not m or not os.path.exists(path):
+        print(f"Not a season file: {path}")
+        return 0
+    season = m.group(2)
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        fieldnames = reader.fieldnames or FIELDNAMES
+        rows = list(reader)
+    by_url = {row['URL']: row for row in rows if row.get('URL')}
+    plans = {u: p for u, p in ((u, gap_plan(r)) for u, r in by_url.items()) if p}
+    
+    print(f"\n{'='*60}")
+    print(f"Filling gaps in {os.path.basename(path)}: {len(plans)}/{len(by_url)} matches incomplete")
+    for market in MARKET_SCRAPERS:
+        whole = sum(1 for p in plans.values() if market in p and p[market] is None)
+        partial = sum(1 for p in plans.values() if p.get(market))
+        if whole or partial:
+            print(f"  {market:<5} whole market: {whole:>4} | lines/sides only: {partial:>4}")
+    print("="*60)
+    if not plans:
+        return 0
+    
+    slots = multiprocessing.Queue()
+    for slot in range(1, num_workers + 1):
+        slots.put(slot)
+    watchdog = MemoryWatchdog(num_workers).start()
+    pending = deque(plans)
+    attempts = {}
+    in_flight = {}
+    hinted = deque()
+    filled_matches = 0
+    filled_cells = 0
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=init_worker,
+                             initargs=(slots, watchdog.throttled)) as executor:
+        def submit():
+            while (pending or hinted) and len(in_flight) < watchdog.allowed:
+                url = hinted.popleft() if hinted else pending.popleft()
+                next_url = pending.popleft() if PREFETCH and pending else None
+                attempts[url] = attempts.get(url, 0) + 1
+                future = executor.submit(scrape_prefetched, url, season, len(attempts) % num_workers + 1,
+                                         plans[url], next_url)
+                in_flight[future] = (url, next_url)
+        
+        while pending or hinted or in_flight:
+            submit()
+            
+            done, _ = wait(in_flight, timeout=WATCHDOG_INTERVAL, return_when=FIRST_COMPLETED)
+            finished = [(future, in_flight.pop(future)) for future in done]
+            # Preloaded URLs go out to the now idle workers before the file is rewritten
+            hinted.extend(next_url for _, (_, next_url) in finished if next_url)
+            submit()
+            for future, (url, _) in finished:
+                try:
+                    data = future.result()
+                except Exception as e:
+                    print(f"  ✗ Error: {e}")
+                    data = None
+                
+                if data:
+                    n = merge_blank_cells(by_url[url], data)
+                    if n:
+                        write_rows(path, fieldnames, rows)
+                    clear_checkpoint(url, season, plans[url])
+                    filled_matches += 1
+                    filled_cells += n
+                    print(f"[{filled_matches}/{len(plans)}] ✓ {by_url[url].get('Home', '?')} vs "
+                          f"{by_url[url].get('Away', '?')}: {n} cells filled")
+                elif attempts[url] <= MAX_MATCH_RETRIES:
+                    print(f"  ↻ requeued {url}")
+                    pending.append(url)
+                else:
+                    print(f"  ✗ gave up on {url} after {attempts[url]} attempts")
+    watchdog.stop()
+    
+    print(f"\nFilled {filled_cells} cells in {filled_matches} matches -> {path}")
+    print(watchdog.summary())
+    return filled_cells
+
+
+def implied_probabilities(odds):
+    """Odds array (sides, matches) -> (margin-free probabilities, overround)."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inverse = 1.0 / odds
+        overround = inverse.sum(axis=0)
+        return inverse / overround, overround
+
+
+def settle_handicap(margin, line):
+    """Settle a bet needing margin + line > 0: 1 win, 0.5 half win, 0 push, -0.5, -1.
+
+    Quarter lines (x.25 / x.75) split the stake over the two neighbouring lines.
+    """
+    line = np.broadcast_to(np.asarray(line, dtype=float), margin.shape)
+    quarter = np.abs(line * 4) % 2 == 1
+    low = np.where(quarter, line - 0.25, line)
+    high = np.where(quarter, line + 0.25, line)
+    return (np.sign(margin + low) + np.sign(margin + high)) / 2
+
+
+def compute_metrics(cols):
+    """Derived metrics for every row of a season table, as {name: float array}."""
+    metrics = {}
+    for name, close_cols, open_cols in MARKETS:
+        sides = [c[len(name) + 1:].replace('Close', '').strip('_') for c in close_cols]
+        close = np.vstack([odds_array(cols[c]) for c in close_cols])
+        opening = np.vstack([odds_array(cols[c]) for c in open_cols])
+        p_close, metrics[f'{name}_Close_Overround'] = implied_probabilities(close)
+        p_open, metrics[f'{name}_Open_Overround'] = implied_probabilities(opening)
+        for i, side in enumerate(sides):
+            metrics[f'{name}_{side}_P_Close'] = p_close[i]
+            metrics[f'{name}_{side}_P_Open'] = p_open[i]
+            metrics[f'{name}_{side}_Move'] = close[i] - opening[i]
+            metrics[f'{name}_{side}_P_Move'] = p_close[i] - p_open[i]
+    
+    ft_h, ft_a, _ = score_arrays(cols['Final_Result'])
+    ht_h, ht_a, _ = score_arrays(cols['HT_Result'])
+    total = ft_h + ft_a
+    diff = ft_h - ft_a
+    metrics['FT_Home_Goals'], metrics['FT_Away_Goals'] = ft_h, ft_a
+    metrics['HT_Home_Goals'], metrics['HT_Away_Goals'] = ht_h, ht_a
+    metrics['Total_Goals'] = total
+    metrics['Result_1'] = np.where(np.isnan(diff), np.nan, diff > 0)
+    metrics['Result_X'] = np.where(np.isnan(diff), np.nan, diff == 0)
+    metrics['Result_2'] = np.where(np.isnan(diff), np.nan, diff < 0)
+    metrics['BTTS_Yes_Hit'] = np.where(np.isnan(total), np.nan, (ft_h > 0) & (ft_a > 0))
+    for line in OU_LINES:
+        over = settle_handicap(total, -line)
+        metrics[f'OU_{ou_line_key(line)}_Over_Result'] = over
+        metrics[f'OU_{ou_line_key(line)}_Under_Result'] = -over
+    for line in AH_LINES:
+        home = settle_handicap(diff, line)
+        metrics[f'AH_{ah_line_key(line)}_Home_Result'] = home
+        metrics[f'AH_{ah_line_key(line)}_Away_Result'] = -home
+    return metrics
+
+
+def metrics_cache_path(season_file):
+    return season_file[:-len('.csv')] + '.metrics.npz'
+
+
+def file_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def build_metrics(directory='.', force=False):
+    """Compute metrics for all season files, reusing caches whose source is unchanged.
+
+    Returns {season file: {metric: array, 'URL': array}}.
+    """
+    if np is None:
+        print("numpy not installed - metrics unavailable")
+        return {}
+    paths = season_files(directory)
+    t0 = time.time()
+    results = {}
+    stale = []
+    digests = {}
+    for path in paths:
+        digests[path] = file_digest(path)
+        cache = metrics_cache_path(path)
+        if not force and os.path.exists(cache):
+            try:
+                with np.load(cache) as npz:
+                    if str(npz['_source_sha1']) == digests[path]:
+                        results[path] = {k: npz[k] for k in npz.files if k != '_source_sha1'}
+                        continue
+            except Exception as e:
+                print(f"Warning: ignoring unreadable cache {cache}: {e}")
+        stale.append(path)
+    
+    if stale:
+        cols = load_all_seasons(stale)
+        metrics = compute_metrics(cols)
+        for i, path in enumerate(stale):
+            rows = cols['_file'] == i
+            season_metrics = {k: v[rows] for k, v in metrics.items()}
+            season_metrics['URL'] = cols['URL'][rows]
+            np.savez(metrics_cache_path(path), _source_sha1=np.array(digests[path]), **season_metrics)
+            results[path] = season_metrics
+    
+    print(f"Metrics: {len(stale)} seasons recomputed, {len(paths) - len(stale)} cached "
+          f"({time.time() - t0:.3f}s)")
+    return {p: results[p] for p in paths}
+
+
 if __name__ == "__main__":
     import sys
     
@@ -827,6 +2101,10 @@ if __name__ == "__main__":
         seasons = []
         num_workers = 8
         run_all = False
+        run_validate = False
+        run_metrics = False
+        queue_path = None
+        fill_gaps = False
         
         for arg in sys.argv[1:]:
             if arg.startswith('--workers='):
@@ -835,8 +2113,30 @@ if __name__ == "__main__":
                 cli_league_slug = arg.split('=', 1)[1]
             elif arg.startswith('--league-name='):
                 cli_league_name = arg.split('=', 1)[1]
+            elif arg == '--fill-gaps':
+                fill_gaps = True
+            elif arg.startswith('--queue='):
+                queue_path = arg.split('=', 1)[1]
+            elif arg == '--fresh-profiles':
+                PERSISTENT_PROFILES = False
+            elif arg.startswith('--profile-root='):
+                PROFILE_ROOT = os.path.abspath(arg.split('=', 1)[1])
+            elif arg.startswith('--worker-mem='):
+                WORKER_MEM_BUDGET_MB = int(arg.split('=')[1])
+            elif arg.startswith('--total-mem='):
+                GLOBAL_MEM_BUDGET_MB = int(arg.split('=')[1])
+            elif arg == '--no-prefetch':
+                PREFETCH = False
+            elif arg == '--no-lean':
+                LEAN_PROFILE = False
+            elif arg.startswith('--lean-allow='):
+                LEAN_ALLOWLIST = {a.strip() for a in arg.split('=', 1)[1].split(',') if a.strip()}
             elif arg in ('all', '--all'):
                 run_all = True
+            elif arg in ('validate', '--validate'):
+                run_validate = True
+            elif arg in ('metrics', '--metrics'):
+                run_metrics = True
             else:
                 seasons.append(arg)
         
@@ -855,6 +2155,22 @@ if __name__ == "__main__":
                     LEAGUE_NAME = LEAGUE_SLUG
             print(f"Overriding league -> {LEAGUE_NAME} ({LEAGUE_SLUG})")
         
+        if run_validate or run_metrics:
+            if run_validate:
+                validate_season_files()
+            if run_metrics:
+                build_metrics()
+            sys.exit(0)
+        
+        if fill_gaps:
+            if seasons and not run_all:
+                paths = [os.path.abspath(f"{OUTPUT_PREFIX}_{season}.csv") for season in seasons]
+            else:
+                paths = season_files()
+            for path in paths:
+                fill_season_gaps(path, num_workers=num_workers)
+            sys.exit(0)
+        
         if run_all:
             seasons = get_available_seasons(LEAGUE_SLUG)
             if not seasons:
@@ -862,7 +2178,7 @@ if __name__ == "__main__":
                 sys.exit(1)
         
         for season in seasons:
-            scrape_season(season, num_workers=num_workers)
+            scrape_season(season, num_workers=num_workers, queue_path=queue_path)
     else:
         # Default: scrape the latest known season for the configured league
         latest = None